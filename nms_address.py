@@ -5,18 +5,17 @@ This script detects a 12-character portal address on the screen,
 decodes it, and converts it into galactic coordinates.
 """
 import os
+import re
 import sys
-import time
+import math
 import logging
-import pyautogui
+import cv2
+import mss
+import numpy as np
 import keyboard
 
 # --- Configuration ---
 
-# Set to True to prevent the script from moving the mouse to the top-left corner
-# of the screen and raising an exception.
-pyautogui.FAILSAFE = True
-
 # Configure logging to show informational messages.
 logging.basicConfig(stream=sys.stderr, level=logging.INFO)
 
@@ -63,57 +62,190 @@ GLYPH_LOCATIONS = [
     (363, 1015, 32, 32)   # Location 11 (X - 3)
 ]
 
+# The screen region (left, top, width, height) that encloses all 12 glyph locations.
+# It is captured once per scan and each glyph is cut out of it.
+STRIP_REGION = (10, 1015, 385, 32)  # Left edge of Location 0 to right edge of Location 11
+
+# The size of a glyph and the horizontal offset of each glyph location within the strip.
+# The glyphs are not evenly spaced (Location 1 is 33 pixels after Location 0).
+GLYPH_SIZE = 32
+GLYPH_OFFSETS = [left - STRIP_REGION[0] for left, _, _, _ in GLYPH_LOCATIONS]
+
+# The minimum template match score (TM_CCOEFF_NORMED, -1.0 to 1.0) a glyph must reach
+# before its best matching symbol is accepted. Calibrated on the images in tests/test_images:
+# the correct symbol always scored 0.95 or higher, the best wrong symbol at most 0.79,
+# and regions without a glyph at most 0.44.
+MIN_CONFIDENCE = 0.85
+
+# Matches a valid portal code: exactly 12 hexadecimal characters and nothing else.
+_HEX12 = re.compile(r"[0-9A-Fa-f]{12}").fullmatch
+
+# --- Template Loading ---
+
+def load_templates():
+    """
+    Loads every glyph template image from disk as a grayscale array.
+
+    Returns:
+        numpy.ndarray: A (16, 32, 32) uint8 array holding the templates in SYMBOL_FILES order.
+    """
+    templates = []
+    for filename in SYMBOL_FILES.values():
+        template = cv2.imread(filename, cv2.IMREAD_GRAYSCALE)
+        if template is None:
+            logging.error(f"Error processing {filename}: unable to read image.")
+            # Without a full set of templates detection cannot work, so exit.
+            sys.exit(1)
+        templates.append(template)
+    return np.stack(templates)
+
+
+def normalize_patches(imgs):
+    """
+    Flattens a stack of images into zero-mean, unit-length float32 rows.
+
+    The dot product of two normalized patches of the same size is exactly the
+    score cv2.matchTemplate gives with TM_CCOEFF_NORMED.
+
+    Args:
+        imgs (numpy.ndarray): Stack of N same-sized grayscale images to normalize.
+
+    Returns:
+        numpy.ndarray: An (N, pixels) float32 array with one normalized image per row.
+    """
+    vectors = imgs.reshape(len(imgs), -1).astype(np.float32)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+    return vectors
+
+
+# The glyph templates are loaded once at import time rather than on every scan.
+# They are kept in one contiguous array; TPL_CHARS[i] is the character of TPL_STACK[i].
+TPL_CHARS = list(SYMBOL_FILES.keys())
+TPL_STACK = load_templates()
+
+# Every template normalized and flattened into one (16, 1024) matrix, so that a single
+# matrix product scores any number of glyph regions against all templates at once.
+TPL_MATRIX = normalize_patches(TPL_STACK)
+
 # --- Core Functions ---
 
-def detect_symbol(region, confidence=0.9):
+def find_best_symbols(region_imgs, confidence=MIN_CONFIDENCE):
     """
-    Detects which glyph symbol is present in a given screen region.
+    Finds which glyph symbol best matches each image in a stack of glyph regions.
+
+    All regions are scored against every template at once with one matrix
+    product, and each region's best symbol is accepted only if it reaches the
+    confidence level.
 
     Args:
-        region (tuple): The (left, top, width, height) of the screen region to search.
-        confidence (float): The confidence level for image matching.
+        region_imgs (numpy.ndarray): Stack of grayscale images, one per glyph location.
+        confidence (float): The minimum match score required to accept a symbol.
 
     Returns:
-        str: The character ('0'-'F') of the detected symbol, or None if no symbol is found.
+        list: A (symbol, score) tuple per region with the character ('0'-'F') of the
+              detected symbol and its match score, or (None, 0.0) if no symbol is found.
     """
-    for symbol, filename in SYMBOL_FILES.items():
-        try:
-            if pyautogui.locateOnScreen(filename, region=region, confidence=confidence):
-                logging.info(f"Detected symbol '{symbol}' in region {region}.")
-                return symbol
+    # The regions and the templates are the same size, so the normalized
+    # cross-correlation of every region with every template is one (N, 16) product.
+    scores = normalize_patches(region_imgs) @ TPL_MATRIX.T
+    best_indices = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(scores)), best_indices]
+
+    results = []
+    for best_index, best_score in zip(best_indices, best_scores.tolist()):
+        best_symbol = TPL_CHARS[best_index]
+        if best_score >= confidence:
+            logging.info(f"Detected symbol '{best_symbol}' (score {best_score:.3f}).")
+            results.append((best_symbol, best_score))
+        else:
+            logging.warning(f"No symbol detected (best was '{best_symbol}' at {best_score:.3f}).")
+            results.append((None, 0.0))
+    return results
 
-        except pyautogui.ImageNotFoundException as e:
-            logging.debug(f"Image not found {symbol} @ {region}: {e}")
 
-        except pyautogui.PyAutoGUIException as e:
-            # This can happen if the image file is not found.
-            logging.error(f"Error processing {filename}: {e}")
-            # To avoid repeated errors for the same missing file, we can exit.
-            sys.exit(1)
-        except Exception as e:
-            # Catch other potential exceptions, though less likely.
-            logging.warning(f"An unexpected error occurred for {filename} in {region}: {e}")
-            
-    logging.warning(f"No symbol detected in region {region}.")
-    return None
+def find_best_symbol(region_img, confidence=MIN_CONFIDENCE):
+    """
+    Finds which glyph symbol best matches the image of a single glyph region.
+
+    Args:
+        region_img (numpy.ndarray): Grayscale image of one glyph location.
+        confidence (float): The minimum match score required to accept a symbol.
+
+    Returns:
+        tuple: The character ('0'-'F') of the detected symbol and its match score,
+               or (None, 0.0) if no symbol is found.
+    """
+    return find_best_symbols(region_img[np.newaxis], confidence)[0]
+
+
+def capture_glyph_strip():
+    """
+    Takes a single screenshot of the strip of screen that holds all 12 glyphs.
+
+    Returns:
+        numpy.ndarray: Grayscale image of the STRIP_REGION area of the screen.
+    """
+    left, top, width, height = STRIP_REGION
+    with mss.mss() as sct:
+        shot = sct.grab({"left": left, "top": top, "width": width, "height": height})
+    return cv2.cvtColor(np.asarray(shot), cv2.COLOR_BGRA2GRAY)
 
 
 def get_portal_code():
     """
     Scans all glyph locations on the screen and assembles the full 12-character portal code.
 
+    The screen is captured only once per scan, and the 12 glyph locations are
+    taken from that one frame and matched in a single batch.
+
     Returns:
-        str: The complete 12-character portal code, or None if any symbol is not detected.
+        tuple: The complete 12-character portal code and the list of per-glyph match scores.
+               Returns (None, None) if any symbol is not detected.
     """
+    strip = capture_glyph_strip()
+
+    # View every glyph-sized window along the strip without copying,
+    # then pick out the 12 windows at the glyph locations.
+    windows = np.lib.stride_tricks.sliding_window_view(strip, (GLYPH_SIZE, GLYPH_SIZE))[0]
+    regions = windows[GLYPH_OFFSETS]
+
     portal_code = ""
-    for i, location in enumerate(GLYPH_LOCATIONS):
-        symbol = detect_symbol(location)
+    scores = []
+    for i, (symbol, score) in enumerate(find_best_symbols(regions)):
         if symbol:
             portal_code += symbol
+            scores.append(score)
         else:
             logging.error(f"Could not decode symbol at location {i+1}. Aborting.")
-            return None
-    return portal_code
+            return None, None
+    return portal_code, scores
+
+
+def calculate_overall_confidence(scores):
+    """
+    Combines the per-glyph match scores into one confidence value for the whole code.
+
+    The geometric mean is used so that a single poorly matched glyph pulls the
+    overall confidence down. It is computed in one pass as the exponent of the
+    mean log score, which also stays accurate for very small scores.
+
+    Args:
+        scores (list): The match score of each detected glyph.
+
+    Returns:
+        float: The geometric mean of the scores, or 0.0 if there are no scores
+               or any score is zero or negative.
+    """
+    if not scores:
+        return 0.0
+
+    log_sum = 0.0
+    for score in scores:
+        if score <= 0:
+            return 0.0
+        log_sum += math.log(score)
+    return math.exp(log_sum / len(scores))
 
 
 def portal_to_galactic_coords(portal_code):
@@ -127,39 +259,31 @@ def portal_to_galactic_coords(portal_code):
         tuple: A tuple containing the galactic coordinates string and the original portal code.
                Returns (None, None) if the portal code is invalid.
     """
-    if not portal_code or len(portal_code) != 12:
+    if not portal_code or not _HEX12(portal_code):
         logging.error("Invalid portal code provided.")
         return None, None
 
-    # Extract components from the portal code: P SSS YY ZZZ XXX
-    p = portal_code[0]
-    sss = portal_code[1:4]
-    yy = portal_code[4:6]
-    zzz = portal_code[6:9]
-    xxx = portal_code[9:12]
+    # Parse the whole code once as a 48-bit integer laid out as P SSS YY ZZZ XXX
+    value = int(portal_code, 16)
 
-    # Just checking that the string is parsed correctly
-    logging.debug(f"{p}:{sss}:{yy}:{zzz}:{xxx}")
-    
-    # Convert components from hex to integers
-    sss_dec = int(sss, 16)
-    yy_dec = int(yy, 16)
-    zzz_dec = int(zzz, 16)
-    xxx_dec = int(xxx, 16)
-
-    # Apply the offsets. These values are confirmed to work with the wrapping logic.
-    x_coord = xxx_dec - 2049
-    y_coord = yy_dec - 129
-    z_coord = zzz_dec - 2049
-    
-    # This wrapping logic is ESSENTIAL for the coordinate system.
-    # It ensures that coordinates are always represented as positive hex values.
-    if x_coord < 0:
-        x_coord += 4096
-    if y_coord < 0:
-        y_coord += 256
-    if z_coord < 0:
-        z_coord += 4096
+    # Extract components from the portal code with shifts and masks
+    p = value >> 44
+    sss_dec = (value >> 32) & 0xFFF
+    yy_dec = (value >> 24) & 0xFF
+    zzz_dec = (value >> 12) & 0xFFF
+    xxx_dec = value & 0xFFF
+
+    # Just checking that the string is parsed correctly. The arguments are passed to
+    # logging rather than pre-formatted, so no string is built unless DEBUG is enabled.
+    logging.debug("%X:%03X:%02X:%03X:%03X", p, sss_dec, yy_dec, zzz_dec, xxx_dec)
+
+    # Apply the offsets. This wrapping logic is ESSENTIAL for the coordinate system.
+    # It ensures that coordinates are always represented as positive hex values:
+    # because 4096 and 256 are powers of two, masking the result is the same as
+    # adding 4096 (or 256) whenever the offset value drops below zero.
+    x_coord = (xxx_dec - 2049) & 0xFFF
+    y_coord = (yy_dec - 129) & 0xFF
+    z_coord = (zzz_dec - 2049) & 0xFFF
 
     # Format the final galactic coordinates string: XXXX:YYYY:ZZZZ:SSSS
     galactic_coordinates = (f"{x_coord:04X}:{y_coord:04X}:{z_coord:04X}:{sss_dec:04X}")
@@ -176,10 +300,11 @@ def run_detection_cycle():
     logging.info("Scanning for portal address...")
     
     # 1. Get the full portal code from the screen
-    code = get_portal_code()
+    code, scores = get_portal_code()
 
     if code:
-        logging.info(f"Successfully decoded Portal Code: {code}")
+        confidence = calculate_overall_confidence(scores)
+        logging.info(f"Successfully decoded Portal Code: {code} (confidence {confidence:.3f})")
         
         # 2. Convert the portal code to galactic coordinates
         galactic_coords, _ = portal_to_galactic_coords(code)
@@ -192,6 +317,19 @@ def run_detection_cycle():
 
     print("#" * 60)
 
+
+def on_capture_key():
+    """
+    Hotkey callback that runs a detection cycle and then prompts the user again.
+    """
+    try:
+        run_detection_cycle()
+    except Exception as e:
+        logging.error(f"An unexpected error occurred during detection: {e}")
+
+    # After running, prompt the user again for clarity
+    print("Ready. Press [`] to capture again or [ctrl+c] to quit.")
+
 # --- Main Execution ---
 
 def main():
@@ -203,32 +341,19 @@ def main():
     print("\nPress [`] while glyphs are visible in photo mode.")
     print("Press [ctrl+c] to quit the application.")
     print("#" * 60)
-    
-    while True:
-        try:
-            # Wait for the next key press event
-            key_event = keyboard.read_event()
-            
-            # We only care about the moment the key is pressed down
-            if key_event.event_type == keyboard.KEY_DOWN:
-                
-                # If the defined key was pressed, run the detection
-                if key_event.name == '`':
-                    run_detection_cycle()
-                    # After running, prompt the user again for clarity
-                    print("Ready. Press [`] to capture again or [ctrl+c] to quit.")
-                
-                # If 'q' was pressed, exit the application
-                elif key_event.name == 'ctrl+c':
-                    logging.info("ctrl+c' pressed. Exiting application.")
-                    break  # Exit the while loop
-                    
-        except KeyboardInterrupt:
-            logging.info("Script stopped by user (Ctrl+C).")
-            break
-        except Exception as e:
-            logging.error(f"An unexpected error occurred in the main loop: {e}")
-            break
+
+    # Let the keyboard library filter key events and only call back on the capture key,
+    # instead of waking up and comparing key names on every key press.
+    keyboard.add_hotkey('`', on_capture_key)
+
+    try:
+        # Block until the quit key combination is pressed
+        keyboard.wait('ctrl+c')
+        logging.info("'ctrl+c' pressed. Exiting application.")
+    except KeyboardInterrupt:
+        logging.info("Script stopped by user (Ctrl+C).")
+    finally:
+        keyboard.unhook_all_hotkeys()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
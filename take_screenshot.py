@@ -2,13 +2,12 @@
 Main routine for No Mans Sky screenshot addres decoder
 """
 import sys
-import time
 import logging
-import pyautogui
+import mss
+import mss.tools
 
 #
 #
-pyautogui.FAILSAFE = True
 logging.basicConfig(stream=sys.stderr, level=logging.INFO)
 
 _loc01_ = ( 10, 1015, 32, 32) # Location 0
@@ -24,11 +23,14 @@ _loc10_ = (299, 1015, 32, 32) # Location 9
 _loc11_ = (331, 1015, 32, 32) # Location 10
 _loc12_ = (363, 1015, 32, 32) # Location 11
 
+_sct_ = mss.mss() # Screen capture handle, reused for every shot
+
 
 
 def take_shot(_region_):
 
-    pyautogui.screenshot(region=_region_, imageFilename='screenshot.png')   
+    _img_ = _sct_.grab({'left': _region_[0], 'top': _region_[1], 'width': _region_[2], 'height': _region_[3]})
+    mss.tools.to_png(_img_.rgb, _img_.size, output='screenshot.png')
 
     
 def main():
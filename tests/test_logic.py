@@ -1,20 +1,24 @@
 """
 Unit tests for the logic functions in the NMS address decoder.
 
-This script tests the portal-to-galactic coordinate conversion logic
-without any dependency on screen reading or image recognition.
+This script tests the portal-to-galactic coordinate conversion logic, the
+confidence scoring and the glyph template matching without any dependency on
+screen reading.
 """
 import os
 import sys
 import unittest
+import cv2
+import numpy as np
 
 # --- Setup for Importing from Parent Directory ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
-# Import the function we want to test
-from nms_address import portal_to_galactic_coords
+# Import the functions we want to test
+from nms_address import (portal_to_galactic_coords, calculate_overall_confidence,
+                         find_best_symbol, TPL_CHARS, TPL_STACK)
 
 class TestCoordinateConversion(unittest.TestCase):
     """Test suite for the portal_to_galactic_coords function."""
@@ -29,6 +33,8 @@ class TestCoordinateConversion(unittest.TestCase):
         "10D6024185B8" : "0DB7:0081:0C17:00D6", # Address from TestImage04
         "122CF79B1D82" : "0581:0076:01B0:022C", # Address from TestImage05
         "109A039BAE4B" : "064A:0082:01B9:009A", # Pilgram Star
+        "000000000000" : "07FF:007F:07FF:0000", # Lowest code, every offset wraps around
+        "FFFFFFFFFFFF" : "07FE:007E:07FE:0FFF", # Highest code, no offset wraps around
     }
     
     def test_known_addresses(self):
@@ -57,7 +63,10 @@ class TestCoordinateConversion(unittest.TestCase):
             "0123456789ABCDEF", # Too long
             "",              # Empty string
             None,            # None value
-            "GHIJKLMNOPQRSTUVWXYZ"   # Contains invalid hex characters
+            "GHIJKLMNOPQRSTUVWXYZ",  # Contains invalid hex characters
+            "GHIJKLMNOPQR",  # Right length, invalid hex characters
+            "0x07AFA92914",  # Right length, hex prefix
+            " 07AFA92914D",  # Right length, surrounding whitespace
         ]
         
         for code in invalid_codes:
@@ -67,6 +76,59 @@ class TestCoordinateConversion(unittest.TestCase):
                                  f"Function did not correctly handle invalid code: {code}")
 
 
+class TestOverallConfidence(unittest.TestCase):
+    """Test suite for the calculate_overall_confidence function."""
+
+    def test_geometric_mean(self):
+        """
+        Tests that the overall confidence is the geometric mean of the glyph scores.
+        """
+        self.assertAlmostEqual(calculate_overall_confidence([0.95] * 12), 0.95)
+        self.assertAlmostEqual(calculate_overall_confidence([0.5, 0.8]), 0.4 ** 0.5)
+
+    def test_non_positive_scores(self):
+        """
+        Tests that an empty score list or any zero or negative score gives 0.0.
+        """
+        for scores in ([], [0.9, 0.0, 0.9], [0.9, -0.2]):
+            with self.subTest(scores=scores):
+                self.assertEqual(calculate_overall_confidence(scores), 0.0)
+
+
+class TestSymbolMatching(unittest.TestCase):
+    """Test suite for the find_best_symbol function."""
+
+    def test_templates_match_themselves(self):
+        """
+        Tests that every template image is detected as its own symbol with a perfect score.
+        """
+        for symbol, template in zip(TPL_CHARS, TPL_STACK):
+            with self.subTest(symbol=symbol):
+                detected, score = find_best_symbol(template)
+                self.assertEqual(detected, symbol)
+                self.assertAlmostEqual(score, 1.0, places=4)
+
+    def test_scores_match_opencv(self):
+        """
+        Tests that the returned score equals OpenCV's TM_CCOEFF_NORMED score.
+        """
+        # Brighten and add a gradient to a template so the match is not perfect.
+        gradient = np.tile(np.arange(32, dtype=np.int16), (32, 1))
+        region = np.clip(TPL_STACK[0].astype(np.int16) // 2 + gradient, 0, 255).astype(np.uint8)
+
+        _, score = find_best_symbol(region, confidence=-1.0)
+        expected = max(cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED)[0, 0]
+                       for template in TPL_STACK)
+        self.assertAlmostEqual(score, float(expected), places=4)
+
+    def test_blank_region(self):
+        """
+        Tests that a region without any glyph in it is rejected.
+        """
+        region = np.full((32, 32), 20, dtype=np.uint8)
+        self.assertEqual(find_best_symbol(region), (None, 0.0))
+
+
 # This allows the script to be run directly from the command line
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file